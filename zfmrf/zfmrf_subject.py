@@ -13,35 +13,278 @@ Adapted for general use.
 
 
 import os
+import io
+import re
+import sys
+import bisect
 import csv
+import glob
+import json
 import shutil
 import datetime
+import functools
+import itertools
+import threading
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 ## 
 from hurahura import mi_subject, miresearch_main
 from hurahura.mi_config import MIResearch_config
-import spydcmtk
-from ngawari import fIO
+try:
+    import orjson # optional - faster json read
+except ImportError:
+    orjson = None
 
 # ====================================================================================================
 #       HELPERS
 # ====================================================================================================
 nameUnknown = 'NAME-Unknown'
-
+sageUIDIndexFileName = '.zfmrf_uid_index.json'
+_sageUIDIndexLock = threading.RLock() # CLI actions run subjects in threads
+_sageUIDIndex_cache = {} # sage_data_dir: (sage_data_dir mtime (ns) index is valid for, index)
+_NAME_SEPARATORS_RE = re.compile(r'[ ^_]+')
+_DATETIME_FORMAT = '%Y%m%d%H%M%S' # DICOM StudyDate + time
+# Gating file names: 
+#   OLD format: SPU*_MMDDYYYY*HH_MM_SS[_*] or *_MMDDYYYY*HH_MM_SS_* 
+#   PhysioArchive: *_*_YYYYMMDD_HHMMSS*
+_GATING_SPU_RE = re.compile(r'SPU[^_]*_(\d{2})(\d{2})(\d{4})[^_]*?(\d{2})_(\d{2})_(\d{2})(?:_|$)')
+_GATING_RE = re.compile(r'(?:^|_)(\d{2})(\d{2})(\d{4})[^_]*?(\d{2})_(\d{2})_(\d{2})_[^_]*$')
+_PHYSIO_ARCHIVE_RE = re.compile(r'[^_]*_[^_]*_(\d{8})_(\d{6})')
+_UID_RE = re.compile(r'\d+(?:\.\d+)+')
 
 
 def run_command(cmd):
-    result = subprocess.run(cmd, shell=True, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    """Run command (list of arguments - no shell) and return stdout"""
+    result = subprocess.run(cmd, shell=False, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     return result.stdout
 
 def parse_csv_from_output(output, start_header="SubjectID"):
-    """Parses CSV part of output starting from a known header line"""
-    lines = output.strip().splitlines()
-    header_index = next(i for i, line in enumerate(lines) if start_header in line)
-    csv_lines = lines[header_index:]
+    """Parses CSV part of output starting from a known header line (single pass over output)"""
+    csv_lines = itertools.dropwhile(lambda line: start_header not in line, io.StringIO(output))
     reader = csv.DictReader(csv_lines)
     return list(reader)
 
+def _read_json(jsonFile):
+    if orjson is not None:
+        with open(jsonFile, 'rb') as fid:
+            try:
+                return orjson.loads(fid.read())
+            except orjson.JSONDecodeError:
+                pass # NaN / Infinity (as written by json.dump) or not UTF-8 - use standard reader
+    return mi_subject.spydcm.dcmTools.parseJsonToDictionary(jsonFile)
+
+def _write_json(jsonFile, dd):
+    # Always fIO: orjson can not match its format (4 space indent, NaN / Infinity, locale encoding), and mixing 
+    # writers would reformat the whole file on each update
+    from ngawari import fIO
+    return fIO.writeDictionaryToJSON(jsonFile, dd)
+
+def _datetime_key(dt):
+    return int(dt.strftime(_DATETIME_FORMAT))
+
+@functools.lru_cache(maxsize=8)
+def _index_gating_dir(gatingDir, dirMTime_ns, PHYSIO_ARCHIVE=False):
+    """Parse dates from gating file names once per directory state (mtime) - shared by subjects of a station.
+
+    Returns:
+        tuple: (sorted YYYYMMDDHHMMSS integer date keys, matching file paths, file names that could not be parsed)
+    """
+    datedFiles, unparsedFiles = [], []
+    with os.scandir(gatingDir) as entries:
+        for iEntry in entries:
+            if PHYSIO_ARCHIVE:
+                m = _PHYSIO_ARCHIVE_RE.match(iEntry.name)
+            elif iEntry.name.startswith('SPU'):
+                m = _GATING_SPU_RE.match(iEntry.name)
+            else:
+                m = _GATING_RE.search(iEntry.name)
+            if m is None:
+                unparsedFiles.append(iEntry.name)
+                continue
+            fileDateKey = int((m[1]+m[2]) if PHYSIO_ARCHIVE else m.expand(r'\3\1\2\4\5\6'))
+            datedFiles.append((fileDateKey, iEntry.path))
+    datedFiles.sort()
+    return tuple(i[0] for i in datedFiles), tuple(i[1] for i in datedFiles), tuple(unparsedFiles)
+
+def _read_first_study_uid(directory):
+    """Return StudyInstanceUID of the first readable dicom under directory (None if none found)"""
+    import spydcmtk
+    for root, _, files in os.walk(directory):
+        for iFile in files:
+            try:
+                ds = spydcmtk.dcmTools.dicom.dcmread(os.path.join(root, iFile), stop_before_pixels=True, 
+                                                     specific_tags=['StudyInstanceUID'], defer_size='1 KB')
+            except (spydcmtk.dcmTools.dicom.filereader.InvalidDicomError, OSError):
+                continue
+            studyInstanceUID = ds.get('StudyInstanceUID', None)
+            if studyInstanceUID is not None:
+                return str(studyInstanceUID)
+    return None
+
+def _list_study_uid_subdirs(directory):
+    """Return sub-directories if directory holds only sub-directories named by the StudyInstanceUID of their 
+    dicoms (one study per directory), else None. 
+    UID names alone are not enough - e.g. exports with one SeriesInstanceUID directory per series."""
+    if not os.path.isdir(directory):
+        return None
+    studyDirs = []
+    with os.scandir(directory) as entries:
+        for iEntry in entries:
+            if not (iEntry.is_dir() and _UID_RE.fullmatch(iEntry.name)):
+                return None
+            studyDirs.append(iEntry)
+    if len(studyDirs) == 0:
+        return None
+    if any(_read_first_study_uid(i.path) != i.name for i in studyDirs):
+        return None
+    return [i.path for i in studyDirs]
+
+def _copy_file(src, dst):
+    """Copy file as shutil.copy2. Data is copied in kernel with copy_file_range (allows reflink / 
+    server side copy on supporting filesystems), falling back to shutil.copyfile (sendfile on linux)."""
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                nCopied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if nCopied == 0: # Some kernels / filesystems (e.g. cross filesystem) return 0 rather than raise
+                    raise OSError(f"copy_file_range stopped with {remaining} bytes remaining")
+                remaining -= nCopied
+    except (AttributeError, OSError): # copy_file_range not available or not supported for these files
+        shutil.copyfile(src, dst) # Rewrites dst from start - so no partial copy remains
+    shutil.copystat(src, dst)
+
+def _is_copy_up_to_date(srcEntry, dst):
+    # As rsync quick check: same size and dst not older than src (copies keep mtime via copystat)
+    try:
+        dstStat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    srcStat = srcEntry.stat()
+    return (srcStat.st_size == dstStat.st_size) and (srcStat.st_mtime_ns <= dstStat.st_mtime_ns)
+
+def _parallel_copytree(src, dst, workers=8):
+    """As shutil.copytree(src, dst, dirs_exist_ok=True) but with file copies run concurrently in threads.
+    Files already in dst with the same size and not older than in src are not copied again."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        dirsToCopy = [(src, dst)]
+        while len(dirsToCopy) > 0:
+            iSrcDir, iDstDir = dirsToCopy.pop()
+            os.makedirs(iDstDir, exist_ok=True)
+            with os.scandir(iSrcDir) as entries:
+                for iEntry in entries:
+                    iDst = os.path.join(iDstDir, iEntry.name)
+                    if iEntry.is_dir():
+                        dirsToCopy.append((iEntry.path, iDst))
+                    elif not _is_copy_up_to_date(iEntry, iDst):
+                        futures.append(executor.submit(_copy_file, iEntry.path, iDst))
+        for iFuture in futures:
+            iFuture.result() # raise any copy errors
+    return dst
+
+def _iter_sage_study_uids(sage_data_dir, NEWEST_FIRST=False):
+    """Walk the sage archive lazily, yielding (StudyInstanceUID, study directory (as spydcmtk getTopDir)).
+    Reads only the StudyInstanceUID tag from one .dcm per directory (a series shares StudyInstanceUID), 
+    so callers may stop at the first match without reading the rest of the archive.
+    """
+    import spydcmtk
+    for root, dirs, files in os.walk(sage_data_dir, topdown=True):
+        if NEWEST_FIRST:
+            dirs.sort(key=lambda d: os.stat(os.path.join(root, d), follow_symlinks=False).st_mtime, reverse=True)
+        for iFile in files:
+            if not iFile.endswith('.dcm'):
+                continue
+            try:
+                ds = spydcmtk.dcmTools.dicom.dcmread(os.path.join(root, iFile), stop_before_pixels=True, 
+                                                     specific_tags=['StudyInstanceUID'], defer_size='1 KB')
+            except (spydcmtk.dcmTools.dicom.filereader.InvalidDicomError, OSError):
+                continue
+            studyInstanceUID = ds.get('StudyInstanceUID', None)
+            if studyInstanceUID is not None:
+                yield str(studyInstanceUID), os.path.dirname(root)
+            break # Read one dicom per directory
+
+def _build_sage_uid_index(sage_data_dir):
+    """Walk the sage archive once and map StudyInstanceUID -> study directory (as spydcmtk getTopDir)"""
+    uidIndex = {}
+    for studyInstanceUID, studyDir in _iter_sage_study_uids(sage_data_dir):
+        uidIndex.setdefault(studyInstanceUID, studyDir)
+    _write_sage_uid_index(sage_data_dir, uidIndex)
+    return uidIndex
+
+def _scan_sage_for_uid(sage_data_dir, studyInstanceUID):
+    """Search sage archive for a StudyInstanceUID - return study directory (as spydcmtk getTopDir) of first match.
+    Searches newest directories first.
+    """
+    return next((studyDir for iUID, studyDir in _iter_sage_study_uids(sage_data_dir, NEWEST_FIRST=True) 
+                 if iUID == studyInstanceUID), None)
+
+def _write_sage_uid_index(sage_data_dir, uidIndex):
+    """Replace index file atomically (temp file + os.replace) so other processes never read a partial index.
+    Writing changes sage_data_dir mtime - so the index file mtime is then set after it (keeps index valid).
+
+    Returns:
+        int: sage_data_dir mtime (ns) after writing - the mtime this index is valid for
+    """
+    indexFile = os.path.join(sage_data_dir, sageUIDIndexFileName)
+    tmpFile = f"{indexFile}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with _sageUIDIndexLock:
+        try:
+            with open(tmpFile, 'w') as fid:
+                json.dump(uidIndex, fid)
+            os.replace(tmpFile, indexFile)
+            os.utime(indexFile)
+        except OSError:
+            # Archive may be read only - then index is only held for this process
+            try:
+                os.remove(tmpFile)
+            except OSError:
+                pass
+        dirMTime_ns = os.stat(sage_data_dir).st_mtime_ns
+        _sageUIDIndex_cache[sage_data_dir] = (dirMTime_ns, uidIndex)
+        return dirMTime_ns
+
+def _record_in_sage_uid_index(sage_data_dir, uidIndex, studyInstanceUID, sageStudyDir):
+    with _sageUIDIndexLock:
+        uidIndex[studyInstanceUID] = sageStudyDir
+        _write_sage_uid_index(sage_data_dir, uidIndex)
+
+def _drop_from_sage_uid_index(sage_data_dir, uidIndex, studyInstanceUID):
+    with _sageUIDIndexLock:
+        uidIndex.pop(studyInstanceUID, None)
+        _write_sage_uid_index(sage_data_dir, uidIndex)
+
+def _read_sage_uid_index(sage_data_dir, dirMTime_ns):
+    """Read index file if valid (newer than sage_data_dir), else None"""
+    indexFile = os.path.join(sage_data_dir, sageUIDIndexFileName)
+    try:
+        if os.stat(indexFile).st_mtime_ns >= dirMTime_ns:
+            with open(indexFile, 'r') as fid:
+                return json.load(fid)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _load_sage_uid_index(sage_data_dir):
+    """Get StudyInstanceUID -> study directory index for the sage archive. 
+    The sidecar index file is valid while it is newer than the sage_data_dir (mtime), else it is rebuilt. 
+    Held per process while sage_data_dir mtime is unchanged (other than by writing the index).
+
+    Returns:
+        dict: StudyInstanceUID -> study directory
+    """
+    with _sageUIDIndexLock:
+        dirMTime_ns = os.stat(sage_data_dir).st_mtime_ns
+        cached = _sageUIDIndex_cache.get(sage_data_dir, None)
+        if (cached is not None) and (cached[0] == dirMTime_ns):
+            return cached[1]
+        uidIndex = _read_sage_uid_index(sage_data_dir, dirMTime_ns)
+        if uidIndex is None:
+            return _build_sage_uid_index(sage_data_dir) # Written - so held in _sageUIDIndex_cache
+        _sageUIDIndex_cache[sage_data_dir] = (dirMTime_ns, uidIndex)
+        return uidIndex
+
 # ====================================================================================================
 #       ABSTRACT SUBJECT CLASS
 # ====================================================================================================
@@ -49,6 +292,8 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
     """
     An abstract subject controlling most basic structure
     """
+    autorthancDicomCounts_cache = {} # StudyInstanceUID: NumberOfDICOMS - see fetchAutorthancCountsBatch
+
     def __init__(self, subjectNumber, 
                         dataRoot=MIResearch_config.data_root_dir,
                         subjectPrefix=MIResearch_config.subject_prefix,
@@ -60,11 +305,17 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
         self.physiology_data_dir = MIResearch_config.params['parameters'].get("physiology_data_dir", None)
         self.sage_data_dir = MIResearch_config.params['parameters'].get("sage_data_dir", None)
         self.dicom_server_ip = MIResearch_config.params['parameters'].get("dicom_server_ip", None)
+        self.projMeta_cache = {}
+        self.spectraScan_cache = None
 
     ### ----------------------------------------------------------------------------------------------------------------
     ### Overriding methods
     ### ----------------------------------------------------------------------------------------------------------------
-    
+    def buildDicomMeta(self):
+        # Called whenever DICOMS are loaded / anonymised - so reset cached DICOM folder list
+        self.__dict__.pop('_dcmFolders', None)
+        return mi_subject.AbstractSubject.buildDicomMeta(self)
+
     ### ----------------------------------------------------------------------------------------------------------------
     ### Methods
     ### ----------------------------------------------------------------------------------------------------------------
@@ -75,10 +326,7 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
 
     def getName_Date_str(self, INCLUDE_EXAMID=True):
         name = self.getName()
-        name = name.replace(" ","_")
-        name = name.replace("^","_")
-        while "__" in name:
-            name = name.replace("__","_")
+        name = _NAME_SEPARATORS_RE.sub("_", name).strip("_")
         try:
             dbDate = self.getStudyDate()
             ss = f"{dbDate[2:4]}_{dbDate[4:6]}_{dbDate[6:8]}_{name}"
@@ -96,15 +344,54 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
         if self.dicom_server_ip is None:
             raise ValueError("DICOM server IP is not set - set in config file")
         thisStudyInstanceUID = self.getTagValue('StudyInstanceUID')
-        cmd = f"pourewa -u {self.dicom_server_ip} -tag StudyInstanceUID {thisStudyInstanceUID}"
+        if thisStudyInstanceUID in ZfMRFSubject.autorthancDicomCounts_cache:
+            return ZfMRFSubject.autorthancDicomCounts_cache[thisStudyInstanceUID]
+        cmd = ["pourewa", "-u", self.dicom_server_ip, "-tag", "StudyInstanceUID", str(thisStudyInstanceUID)]
         output = run_command(cmd)
         data = parse_csv_from_output(output, start_header="SubjectID")
-        result_dict = {row['StudyInstanceUID']: row for row in data}
-        if thisStudyInstanceUID in result_dict:
-            return result_dict[thisStudyInstanceUID]['NumberOfDICOMS']
+        matchingRow = next((row for row in data if row['StudyInstanceUID'] == thisStudyInstanceUID), None)
+        if matchingRow is not None:
+            return matchingRow['NumberOfDICOMS']
         else:
             return 0
 
+    @classmethod
+    def fetchAutorthancCountsBatch(cls, subjects):
+        """Get the number of DICOMS in the Autorthanc server for many subjects with a single pourewa call.
+        pourewa matches "-tag" values as substrings - so query once with the common prefix of all StudyInstanceUIDs.
+        pourewa lists series and instances of every study matching the prefix - so a short prefix (e.g. org root) 
+        can return the whole server. The single call is only made if the prefix covers the UID root (all but the 
+        last UID component) of every study (e.g. all from one scanner), else one pourewa call is made per study.
+        Results are cached and used by getNumberOfDICOMS_Autorthanc.
+
+        Args:
+            subjects (list): list of ZfMRFSubject
+
+        Returns:
+            dict: StudyInstanceUID: NumberOfDICOMS (0 if not on server)
+        """
+        subjUIDs = [(i, i.getTagValue('StudyInstanceUID', None)) for i in subjects]
+        subjUIDs = [(i, str(iUID)) for i, iUID in subjUIDs if iUID is not None]
+        if len(subjUIDs) == 0:
+            return {}
+        if subjUIDs[0][0].dicom_server_ip is None:
+            raise ValueError("DICOM server IP is not set - set in config file")
+        studyInstanceUIDs = [iUID for _, iUID in subjUIDs]
+        commonPrefix = os.path.commonprefix(studyInstanceUIDs)
+        if len(commonPrefix) < max(i.rfind('.') + 1 for i in studyInstanceUIDs):
+            counts = {iUID: iSubj.getNumberOfDICOMS_Autorthanc() for iSubj, iUID in subjUIDs}
+            ZfMRFSubject.autorthancDicomCounts_cache.update(counts)
+            return counts
+        cmd = ["pourewa", "-u", subjUIDs[0][0].dicom_server_ip, "-tag", "StudyInstanceUID", commonPrefix]
+        output = run_command(cmd)
+        data = parse_csv_from_output(output, start_header="SubjectID")
+        counts = dict.fromkeys(studyInstanceUIDs, 0)
+        for row in data:
+            if row['StudyInstanceUID'] in counts:
+                counts[row['StudyInstanceUID']] = row['NumberOfDICOMS']
+        ZfMRFSubject.autorthancDicomCounts_cache.update(counts)
+        return counts
+
     def isNumberOfDICOMS_vs_Autorthanc_equal(self):
         """Check the number of DICOMS in the subject directory and the number of DICOMS in the Autorthanc server.
         """
@@ -138,14 +425,17 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
             int: 0 for success, otherwise 1
         """
         if self.dicom_server_ip is not None:
-            if len(os.listdir(directoryToSend)) > 0:
-                cmd = f"pourewa -u {self.dicom_server_ip} -l {directoryToSend}"
+            with os.scandir(directoryToSend) as entries:
+                HAS_FILES = any(True for _ in entries)
+            if HAS_FILES:
+                cmd = ["pourewa", "-u", self.dicom_server_ip, "-l", str(directoryToSend)]
 
-                self.logger.info(f"Uploading {self.subjID} to autorthanc")
+                self.logger.info("Uploading %s to autorthanc", self.subjID)
                 try:
-                    self.logger.debug(f"Upload command: {cmd}")
-                    result = subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
-                    self.logger.debug(f"Upload command output: {result.stdout}")
+                    self.logger.debug("Upload command: %s", cmd)
+                    result = subprocess.run(cmd, shell=False, check=True, capture_output=True, text=True)
+                    ZfMRFSubject.autorthancDicomCounts_cache.pop(self.getTagValue('StudyInstanceUID'), None)
+                    self.logger.debug("Upload command output: %s", result.stdout)
                     return 0
                 except subprocess.CalledProcessError as e:
                     self.logger.error(f"Failed to upload to autorthanc: {e}")
@@ -165,14 +455,22 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
 
 
     def hasPhysiologicalGating(self):
-        return len(os.listdir(self.getPhysiologicalDataDir())) > 0
+        with os.scandir(self.getPhysiologicalDataDir()) as entries:
+            return any(True for _ in entries)
     
 
     @mi_subject.ui_method(description="Copy gating data to study", category="ZFMRF", order=10)
-    def copyGatingToStudy(self, gatingDir=None):
+    def copyGatingToStudy(self, gatingDir=None, FORCE=False):
         """Will find the Physiology data appropriate for your study and copy to directory:
         self.getPhysiologicalDataDir() ==> SUBJID/RAW/PHYSIOLOGICAL_DATA
+
+        Args:
+            gatingDir (str, optional): Gating directory to search (OLD format). Defaults to None (use physiology_data_dir).
+            FORCE (bool, optional): Should search and copy if gating already present. Defaults to False.
         """
+        if (not FORCE) and self.hasPhysiologicalGating():
+            self.logger.info("Gating already present in RAW/PHYSIOLOGICAL_DATA - not searching (use FORCE to search and copy)")
+            return 0
         if gatingDir is None: # None passed - check gating AND PyhsioArchive directories
             if self.physiology_data_dir is None:
                 self.logger.error("physiology_data_dir is not set - set in config file")
@@ -180,73 +478,68 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
             if not os.path.isdir(self.physiology_data_dir):
                 self.logger.error(f"physiology_data_dir is not a directory: {self.physiology_data_dir}")
                 return
-            stationName = self.getTagValue("StationName")
-            gatingDir = os.path.join(self.physiology_data_dir, stationName, 'gating')
-            self.copyGatingToStudy_OLD(gatingDir=gatingDir)
-            physioArchiveDir = os.path.join(self.physiology_data_dir, stationName, 'PhysioArchive')
-            return self.copyGatingToStudy_PhysioArchive(physioArchiveDir=physioArchiveDir)
+            stationDir = os.path.join(self.physiology_data_dir, self.getTagValue("StationName"))
+            examTimes = self._getExamStartEndDatetime() # Parsed once for both gating formats
+            self.copyGatingToStudy_OLD(gatingDir=os.path.join(stationDir, 'gating'), examTimes=examTimes)
+            return self.copyGatingToStudy_PhysioArchive(physioArchiveDir=os.path.join(stationDir, 'PhysioArchive'), 
+                                                        examTimes=examTimes)
         ##
         return self.copyGatingToStudy_OLD(gatingDir=gatingDir)
 
 
-    def copyGatingToStudy_OLD(self, gatingDir):
-        if (gatingDir is None) or (not os.path.isdir(gatingDir)):
-            self.logger.error(f"Gating backup directory not accessible: {gatingDir}")
-            return
+    def _getExamStartEndDatetime(self):
         tStart, tEnd = self.getStartTime_EndTimeOfExam()
         tStart, tEnd = str(tStart), str(tEnd)
         doScan = self.getMetaDict()['StudyDate']
-        t1 = datetime.datetime.strptime(str(doScan+tStart), '%Y%m%d%H%M%S')
-        t2 = datetime.datetime.strptime(str(doScan+tEnd), '%Y%m%d%H%M%S')
-        gatingFiles = os.listdir(gatingDir)
-        c0 = 0
-        for iFile in gatingFiles:
-            parts = iFile.split('_')
-            if iFile.startswith('SPU'):
-                dos = parts[1][:8]
-                HH = parts[1][-2:]
-                fileDateStr = dos+HH+parts[2]+parts[3]
-            else:
-                dos = parts[-4][:8]
-                HH = parts[-4][-2:]
-                fileDateStr = dos+HH+parts[-3]+parts[-2]
-            try:
-                fileDate = datetime.datetime.strptime(fileDateStr, '%m%d%Y%H%M%S')
-            except ValueError:
-                self.logger.warning(f"Could not parse date from {iFile}")
-                continue
-            if (fileDate < t2) and (fileDate > t1):
-                shutil.copy2(os.path.join(gatingDir, iFile), self.getPhysiologicalDataDir())
-                c0 += 1
-        self.logger.debug(f"Searched {gatingDir} for gating files between {t1.strftime('%Y%m%d%H%M%S')} and {t2.strftime('%Y%m%d%H%M%S')}")
-        self.logger.info(f"Copied {c0} gating files (OLD FORMAT) to RAW/PHYSIOLOGICAL_DATA directory")
+        t1 = datetime.datetime.strptime(str(doScan+tStart), _DATETIME_FORMAT)
+        t2 = datetime.datetime.strptime(str(doScan+tEnd), _DATETIME_FORMAT)
+        return t1, t2
+
+
+    def _copyGatingFilesInWindow(self, fileDateKeys, gatingFiles, t1Key, t2Key):
+        # fileDateKeys sorted - so files strictly between t1Key and t2Key are a contiguous slice
+        i0, i1 = bisect.bisect_right(fileDateKeys, t1Key), bisect.bisect_left(fileDateKeys, t2Key)
+        physioDataDir = self.getPhysiologicalDataDir()
+        for iFile in gatingFiles[i0:i1]:
+            shutil.copy2(iFile, physioDataDir)
+        return max(0, i1 - i0)
+
+
+    def copyGatingToStudy_OLD(self, gatingDir, examTimes=None):
+        if (gatingDir is None) or (not os.path.isdir(gatingDir)):
+            self.logger.error(f"Gating backup directory not accessible: {gatingDir}")
+            return
+        if examTimes is None:
+            examTimes = self._getExamStartEndDatetime()
+        t1, t2 = examTimes
+        # YYYYMMDDHHMMSS integers compare (and sort) chronologically - so no datetime built per file
+        t1Key, t2Key = _datetime_key(t1), _datetime_key(t2)
+        fileDateKeys, gatingFiles, unparsedFiles = _index_gating_dir(gatingDir, os.stat(gatingDir).st_mtime_ns)
+        for iFile in unparsedFiles:
+            self.logger.warning(f"Could not parse date from {iFile}")
+        c0 = self._copyGatingFilesInWindow(fileDateKeys, gatingFiles, t1Key, t2Key)
+        self.logger.debug("Searched %s for gating files between %s and %s", gatingDir, t1Key, t2Key)
+        self.logger.info("Copied %d gating files (OLD FORMAT) to RAW/PHYSIOLOGICAL_DATA directory", c0)
         return 0
     
 
-    def copyGatingToStudy_PhysioArchive(self, physioArchiveDir):
+    def copyGatingToStudy_PhysioArchive(self, physioArchiveDir, examTimes=None):
         """Will find the Physiology data appropriate for your study and copy to directory:
         self.getPhysiologicalDataDir() ==> SUBJID/RAW/PHYSIOLOGICAL_DATA
         """
         if not os.path.isdir(physioArchiveDir):
             self.logger.error("PhysioArchive directory not accessible")
             return
-        tStart, tEnd = self.getStartTime_EndTimeOfExam()
-        tStart, tEnd = str(tStart), str(tEnd)
-        doScan = self.getMetaDict()['StudyDate']
-        t1 = datetime.datetime.strptime(str(doScan+tStart), '%Y%m%d%H%M%S')
-        t2 = datetime.datetime.strptime(str(doScan+tEnd), '%Y%m%d%H%M%S') + datetime.timedelta(hours=1)
-        c0 = 0
-        for iFile in os.listdir(physioArchiveDir):
-            parts = iFile.split('_')
-            try:
-                fileDate = datetime.datetime.strptime(parts[2]+parts[3][:6], '%Y%m%d%H%M%S')
-            except ValueError:
-                continue # File not in format we expect so skip
-            if (fileDate < t2) and (fileDate > t1):
-                shutil.copy2(os.path.join(physioArchiveDir, iFile), self.getPhysiologicalDataDir())
-                c0 += 1
-        self.logger.debug(f"Searched {physioArchiveDir} for gating files between {t1.strftime('%Y%m%d%H%M%S')} and {t2.strftime('%Y%m%d%H%M%S')}")
-        self.logger.info(f"Copied {c0} gating files to RAW/PHYSIOLOGICAL_DATA directory")
+        if examTimes is None:
+            examTimes = self._getExamStartEndDatetime()
+        t1, t2 = examTimes
+        t2 = t2 + datetime.timedelta(hours=1)
+        t1Key, t2Key = _datetime_key(t1), _datetime_key(t2)
+        fileDateKeys, gatingFiles, _ = _index_gating_dir(physioArchiveDir, os.stat(physioArchiveDir).st_mtime_ns, 
+                                                         PHYSIO_ARCHIVE=True)
+        c0 = self._copyGatingFilesInWindow(fileDateKeys, gatingFiles, t1Key, t2Key)
+        self.logger.debug("Searched %s for gating files between %s and %s", physioArchiveDir, t1Key, t2Key)
+        self.logger.info("Copied %d gating files to RAW/PHYSIOLOGICAL_DATA directory", c0)
         return 0
 
 
@@ -257,43 +550,70 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
         return self._getDir(['RAW', 'SPECTRA'], BUILD_IF_NEED=True)
 
 
+    def _scanSpectra(self):
+        """Entries of the spectra directory - one scan shared by hasSpectra, getSpectraPDF_dict, isSpectraComplete. 
+        Cached until the spectra directory is modified (mtime)."""
+        spectraDir = self.getSpectraDir()
+        scanKey = (spectraDir, os.stat(spectraDir).st_mtime_ns)
+        if (self.spectraScan_cache is None) or (self.spectraScan_cache[0] != scanKey):
+            with os.scandir(spectraDir) as spectraEntries:
+                self.spectraScan_cache = (scanKey, list(spectraEntries))
+        return self.spectraScan_cache[1]
+
+
     def hasSpectra(self):
-        return len(os.listdir(self.getSpectraDir())) > 0
+        return len(self._scanSpectra()) > 0
 
 
-    def _findSpectraInSAGE(self):
-        if self.sage_data_dir is None:
+    def _findSpectraInSAGE(self, REFRESH_INDEX=False):
+        """Find sage study directory for this subject: by PatientID / StudyID, else by StudyInstanceUID (index).
+
+        Args:
+            REFRESH_INDEX (bool, optional): Scan sage archive if StudyInstanceUID not in index. Defaults to False.
+        """
+        sageDataDir = self.sage_data_dir
+        if sageDataDir is None:
             self.logger.error("SPECTRA: sage_data_dir is not set - set in config file")
         # First we check based upon the KISPI sage directory structure (this is fast)
         patID = self.getTagValue("PatientID")
         studyID = self.getStudyID()
         if str(studyID) == "0":
             studyID = self.getTagValue("ScannerStudyID")
-        self.logger.info(f"SPECTRA: searching for: patID {patID}, studyID: {studyID}") 
+        self.logger.info("SPECTRA: searching for: patID %s, studyID: %s", patID, studyID) 
         if (patID is not None) and (studyID is not None):
-            for iDir in os.listdir(self.sage_data_dir):
-                if patID in iDir:
-                    sageStudyDir = os.path.join(self.sage_data_dir, iDir, studyID)
-                    if os.path.isdir(sageStudyDir):
-                        self.logger.info(f"SPECTRA: found sage study directory: {sageStudyDir}") 
-                        return sageStudyDir
-                    else:
-                        self.logger.warning(f"SPECTRA: Expect {sageStudyDir} but not found")    
+            # patID matched as substring of sage patient directory name. Trailing separator: match directories only
+            sageStudyDirs = glob.glob(os.path.join(glob.escape(sageDataDir), f"*{glob.escape(patID)}*", 
+                                                   glob.escape(str(studyID)), ""))
+            if len(sageStudyDirs) > 0:
+                sageStudyDir = os.path.dirname(sageStudyDirs[0])
+                self.logger.info("SPECTRA: found sage study directory: %s", sageStudyDir) 
+                return sageStudyDir
+            else:
+                self.logger.warning(f"SPECTRA: Expect {studyID} in a sage directory matching {patID} but not found")    
         else:
             self.logger.warning(f"SPECTRA: Could not find sage dir because patID={patID}, studyID={studyID}")
-        self.logger.info(f"SPECTRA: Could not find sage dir by patID....")
+        self.logger.info("SPECTRA: Could not find sage dir by patID....")
         ## 
-        ## If we did not find a matching sage directory, then we check based upon StudyInstanceUID by 
-        ## checking all the dicoms in the Sage archive (this is slow but should be more robust)
+        ## If we did not find a matching sage directory, then we check based upon StudyInstanceUID
+        ## Via the sage StudyInstanceUID index (fast) - a miss against a valid index is final. The dicoms in the 
+        ## Sage archive are only scanned (slow) if the indexed directory has gone, or if REFRESH_INDEX
         studyInstanceUID = self.getTagValue("StudyInstanceUID")
-        self.logger.info(f"SPECTRA: Searching using spydcmtk: studyInstanceUID={studyInstanceUID}") 
-        listOfSage = spydcmtk.dcmTK.ListOfDicomStudies.setFromDirectory(self.sage_data_dir, HIDE_PROGRESSBAR=True, extn_filter=".dcm")
-        matchingSageStudy = listOfSage.getStudyByTag("StudyInstanceUID", studyInstanceUID)
-        if matchingSageStudy is not None:
-            # Found a matching sage study - so return the directory
-            sageStudyDir = matchingSageStudy.getTopDir()
+        uidIndex = _load_sage_uid_index(sageDataDir)
+        sageStudyDir = uidIndex.get(studyInstanceUID, None)
+        IS_STALE = (sageStudyDir is not None) and (not os.path.isdir(sageStudyDir))
+        if IS_STALE: # e.g. study moved between sage patient directories (does not change sage_data_dir mtime)
+            self.logger.warning("SPECTRA: indexed sage study directory no longer exists: %s", sageStudyDir) 
+            _drop_from_sage_uid_index(sageDataDir, uidIndex, studyInstanceUID)
+            sageStudyDir = None
+        if (sageStudyDir is None) and (IS_STALE or REFRESH_INDEX):
+            self.logger.info("SPECTRA: Searching sage archive: studyInstanceUID=%s", studyInstanceUID) 
+            sageStudyDir = _scan_sage_for_uid(sageDataDir, studyInstanceUID)
+            if sageStudyDir is not None:
+                # Found a matching sage study - so record in index 
+                _record_in_sage_uid_index(sageDataDir, uidIndex, studyInstanceUID, sageStudyDir)
+        if sageStudyDir is not None:
             if os.path.isdir(sageStudyDir):
-                self.logger.info(f"SPECTRA: found sage study directory: {sageStudyDir}") 
+                self.logger.info("SPECTRA: found sage study directory: %s", sageStudyDir) 
                 return sageStudyDir
             else:
                 # this should never be returned - possible if network issue
@@ -308,7 +628,8 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
         self.getSpectraDir() ==> SUBJID/RAW/SPECTRA
 
         Args:
-            FORCE (bool, optional): Should copy if already present. Defaults to False.
+            FORCE (bool, optional): Should copy if already present (and search sage archive if study 
+                                    not in sage index). Defaults to False.
 
         Returns:
             int: 0 for success else 1
@@ -317,42 +638,43 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
             return 0
         if self.sage_data_dir is None:
             self.logger.error("SPECTRA: sage_data_dir is not set - set in config file")
-        sageDir = self._findSpectraInSAGE()
+        sageDir = self._findSpectraInSAGE(REFRESH_INDEX=FORCE)
         if sageDir is not None:
-            shutil.copytree(sageDir, self.getSpectraDir(), dirs_exist_ok=True)
-            self.logger.info('SPECTRA: Copy spectra to study: (%s, %s)'%(sageDir, self.getSpectraDir()))
+            spectraDir = self.getSpectraDir()
+            _parallel_copytree(sageDir, spectraDir)
+            self.logger.info('SPECTRA: Copy spectra to study: (%s, %s)', sageDir, spectraDir)
             return 0
         return 1
     
 
-    def getSpectraPDF_dict(self):
+    def getSpectraPDF_dict(self, spectraEntries=None):
+        if spectraEntries is None:
+            spectraEntries = self._scanSpectra()
         specPDF_dict = {}
-        for iDir in os.listdir(self.getSpectraDir()):
-            try:
-                int(iDir)
-                thisSpectraDir = os.path.join(self.getSpectraDir(), iDir)
-                specPDF_dict[iDir] = ''
-                for iSub in os.listdir(thisSpectraDir):
-                    if (iSub.startswith('P') and iSub.endswith('.7.PDF')):
-                        specPDF_dict[iDir] = os.path.join(thisSpectraDir, iSub)
-            except NameError:
+        for iEntry in spectraEntries:
+            if (not iEntry.name.isdigit()) or (not iEntry.is_dir()):
                 continue
+            specPDF_dict[iEntry.name] = ''
+            with os.scandir(iEntry.path) as subEntries:
+                for iSub in subEntries:
+                    if iSub.name.startswith('P') and iSub.name.endswith('.7.PDF') and iSub.is_file():
+                        specPDF_dict[iEntry.name] = iSub.path
         return specPDF_dict
     
 
     def isSpectraComplete(self):
-        if not self.hasSpectra():
+        spectraEntries = self._scanSpectra()
+        if len(spectraEntries) == 0:
             return False
-        spectraDict = self.getSpectraPDF_dict()
-        pdfFiles_tf = [os.path.isfile(i) for i in spectraDict.values()]
-        return all(pdfFiles_tf)
+        spectraDict = self.getSpectraPDF_dict(spectraEntries)
+        return all(spectraDict.values()) # PDF paths only set for existing files (DirEntry.is_file)
 
 
     ### ----------------------------------------------------------------------------------------------------------------
     ### ARCHIVED DATA
     ### ----------------------------------------------------------------------------------------------------------------
     def getMRIDataFromArchive(self, archiveDir):
-        self.logger.debug(f"Getting MRI archive data for {self.subjID} from {archiveDir} ")
+        self.logger.debug("Getting MRI archive data for %s from %s ", self.subjID, archiveDir)
         patientID = self.getTagValue("PatientID", ifNotFound=None)
         if patientID is None:
             raise ValueError(f"Patient ID not found for {self.subjID}")
@@ -364,19 +686,27 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
         if examID is None:
             raise ValueError(f"ExamID not found for {self.subjID}")
         
-        remotePatientDir = None
-        for iSubDir in os.listdir(archiveDir):
-            if iSubDir.startswith(f"_{patientID}"):
-                remotePatientDir = os.path.join(archiveDir, iSubDir)
+        patientDirPrefix = f"_{patientID}"
+        with os.scandir(archiveDir) as archiveEntries:
+            remotePatientDir = next((i.path for i in archiveEntries if i.name.startswith(patientDirPrefix)), None)
         if remotePatientDir is None:
             raise ValueError(f"Can not find remotePatientDir for {self.subjID} w patID: {patientID}")
-        possibleMatches = []
-        for iDir in os.listdir(remotePatientDir):
-            if (dos in iDir) and (examID in iDir):
-                possibleMatches.append(os.path.join(remotePatientDir, iDir))
-        self.logger.debug(f"Found {len(possibleMatches)} archive to load from")
+        with os.scandir(remotePatientDir) as patientEntries:
+            possibleMatches = [i.path for i in patientEntries if (dos in i.name) and (examID in i.name)]
+        self.logger.debug("Found %d archive to load from", len(possibleMatches))
+        import spydcmtk
         for iArchive in possibleMatches:
-            self.logger.info(f"Loading DICOMS from {iArchive}")
+            self.logger.info("Loading DICOMS from %s", iArchive)
+            studyDirs = _list_study_uid_subdirs(iArchive)
+            if studyDirs is not None: # One study per directory - so read and load one study at a time
+                for iStudyDir in studyDirs:
+                    try:
+                        dcmStudies = [spydcmtk.dcmTK.DicomStudy.setFromDirectory(iStudyDir)]
+                    except ValueError: # More than one study found in directory
+                        dcmStudies = spydcmtk.dcmTK.ListOfDicomStudies.setFromInput(iStudyDir)
+                    for iStudie in dcmStudies:
+                        self.loadSpydcmStudyToSubject(iStudie)
+                continue
             dcmStudies = spydcmtk.dcmTK.ListOfDicomStudies.setFromInput(iArchive)
             for iStudie in dcmStudies:
                 self.loadSpydcmStudyToSubject(iStudie)
@@ -385,16 +715,28 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
     ### ----------------------------------------------------------------------------------------------------------------
     ### DTI / T1 - these are just examples for some basic functionality
     ### ----------------------------------------------------------------------------------------------------------------
+    @functools.cached_property
+    def _dcmFolders(self):
+        # Cached as getDicomFoldersListStr scans the DICOM directory - reset by buildDicomMeta 
+        return self.getDicomFoldersListStr(FULL=False)
+
+
+    def hasSeriesMatching(self, *patterns):
+        """Check if any DICOM series folder (SE##_description) matches any of patterns (regex, case insensitive).
+        Single regex search over all folder names.
+
+        Returns:
+            bool: True if any match
+        """
+        return re.search('|'.join(patterns), '\n'.join(self._dcmFolders), re.IGNORECASE) is not None
+
+
     def hasDTI(self):
-        descList = self.getDicomFoldersListStr(FULL=False)
-        tf = ['dti' in i.lower() for i in descList]
-        return any(tf)
+        return self.hasSeriesMatching('dti')
 
 
     def hasT1(self):
-        descList = self.getDicomFoldersListStr(FULL=False)
-        tf = ['t1' in i.lower() for i in descList]
-        return any(tf)
+        return self.hasSeriesMatching('t1')
     
 
     ### ----------------------------------------------------------------------------------------------------------------
@@ -408,18 +750,33 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
         return os.path.join(self.getProjectDir(projName, BUILD_IF_NEED=BUILD_IF_NEED), f"{projName}_{suffix}.json")
 
 
-    def getProjMetaDict(self, projName):
+    def _cacheProjMeta(self, projName):
         jsonFile = self.getProjectMetaFile(projName=projName)
+        dd = {}
         if os.path.isfile(jsonFile):
-            return mi_subject.spydcm.dcmTools.parseJsonToDictionary(jsonFile)
-        return {}
+            dd = _read_json(jsonFile)
+        self.projMeta_cache[projName] = dd
+
+
+    def getProjMetaDict(self, projName):
+        """Get project meta json file as dictionary. Will check if cached (updated by updateProjMetaDict).
+
+        Args:
+            projName (str): Name of project
+
+        Returns:
+            dict: Project meta json file
+        """
+        if projName not in self.projMeta_cache:
+            self._cacheProjMeta(projName)
+        return self.projMeta_cache[projName]
 
 
     def updateProjMetaDict(self, projName, metaDict):
         jsonFile = self.getProjectMetaFile(projName, BUILD_IF_NEED=True)
         dd = self.getProjMetaDict(projName)
         dd.update(metaDict)
-        fIO.writeDictionaryToJSON(jsonFile, dd)
+        _write_json(jsonFile, dd)
         self.logger.info(f'Updated {projName} meta file')
 
 # ====================================================================================================
@@ -429,6 +786,60 @@ class ZfMRFSubject(mi_subject.AbstractSubject):
 ### ====================================================================================================================
 #      THIS IS ZFMRF SPECIFIC COMMAND LINE ACTIONS
 ### ====================================================================================================================
+def _runForEachSubject(func, subjList, nJobs=1):
+    """Run func(iSubj) for each subject and return results (in subject order). 
+    Actions are I/O bound (disk walks, copies, subprocess) so if nJobs > 1 subjects are run concurrently 
+    in nJobs threads. Only for actions where each subject works in its own directory, and not with the hurahura 
+    database enabled (one sqlite connection - usable only from the thread that opened it)."""
+    if nJobs <= 1:
+        return [func(iSubj) for iSubj in subjList]
+    with ThreadPoolExecutor(max_workers=max(1, min(nJobs, len(subjList)))) as executor:
+        return list(executor.map(func, subjList))
+
+
+def _isNameMatch(iSubj, qName):
+    try:
+        return qName.lower() in iSubj.getName().lower()
+    except Exception as e:
+        return False
+
+
+def _getTagLines(iSubj):
+    try:
+        tags = iSubj.getMetaDict() # cached by subject - do not modify
+        return [f"{ikey} = {iValue}" for ikey, iValue in sorted(tags.items()) if ikey != "Series"]
+    except Exception as e:
+        return None
+
+
+def _cpGating(iSubj, FORCE=False):
+    try:
+        iSubj.copyGatingToStudy(FORCE=FORCE)
+    except Exception as e:
+        print(f"Error copying gating to study for {iSubj}: {e}")
+
+
+def _cpSpectra(iSubj):
+    try:
+        iSubj.copySpectraToStudy()
+    except Exception as e:
+        print(f"Error copying spectra to study for {iSubj}: {e}")
+
+
+def _pullDicomsFromRemote(iSubj, archiveDir):
+    try:
+        iSubj.getMRIDataFromArchive(archiveDir)
+    except Exception as e:
+        print(f"Error pulling DICOMS from remote archive for {iSubj}: {e}")
+
+
+def _delData(iSubj):
+    try:
+        iSubj.delteAllButMeta()
+    except Exception as e:
+        print(f"Error deleting all but meta for {iSubj}: {e}")
+
+
 def zfmrf_specific_actions(args):
     try:
         subjList = mi_subject.SubjectList([MIResearch_config.class_obj(sn, MIResearch_config.data_root_dir, MIResearch_config.subject_prefix, suffix=args.subjSuffix) for sn in args.subjNList])
@@ -437,65 +848,42 @@ def zfmrf_specific_actions(args):
     if args.DEBUG: 
         for iSubj in subjList:
             iSubj.logger.setLevel("DEBUG")
+    nJobs = args.jobs
+    if (nJobs > 1) and getattr(MIResearch_config, 'database_enabled', False):
+        print(f"-jobs {nJobs} ignored: subjects run sequentially when database is enabled")
+        nJobs = 1
 
 
     if args.qName is not None: 
         subjList.reduceToExist()
-        for iSubj in subjList:
-            try:
-                if args.qName.lower() in iSubj.getName().lower():
-                    print(f"{args.qName} = {iSubj}")
-            except Exception as e:
-                continue
+        isMatchList = _runForEachSubject(functools.partial(_isNameMatch, qName=args.qName), subjList, nJobs)
+        for iSubj, isMatch in zip(subjList, isMatchList):
+            if isMatch:
+                print(f"{args.qName} = {iSubj}")
 
 
-    elif args.cpGating:
+    elif args.cpGating or args.cpGatingForce:
         subjList.reduceToExist()
-        for iSubj in subjList:
-            try:
-                iSubj.copyGatingToStudy()   
-            except Exception as e:
-                print(f"Error copying gating to study for {iSubj}: {e}")
-                continue
+        _runForEachSubject(functools.partial(_cpGating, FORCE=args.cpGatingForce), subjList, nJobs)
 
     elif args.cpSpectra:
         subjList.reduceToExist()
-        for iSubj in subjList:
-            try:
-                iSubj.copySpectraToStudy()
-            except Exception as e:
-                print(f"Error copying spectra to study for {iSubj}: {e}")
-                continue
+        _runForEachSubject(_cpSpectra, subjList, nJobs)
 
     elif args.pTags:
         subjList.reduceToExist()
-        for iSubj in subjList:
-            try:
-                tags = iSubj.getMetaDict()
-                tags.pop("Series")
-                for ikey in sorted(tags.keys()):
-                    print(f"{ikey} = {tags[ikey]}")
-                print("")
-            except Exception as e:
+        for tagLines in _runForEachSubject(_getTagLines, subjList, nJobs):
+            if tagLines is None:
                 continue
+            sys.stdout.write("".join(f"{iLine}\n" for iLine in tagLines) + "\n") # One write per subject
 
     elif args.pullDicomsFromRemote is not None:
         subjList.reduceToExist()
-        for iSubj in subjList:
-            try:
-                iSubj.getMRIDataFromArchive(args.pullDicomsFromRemote)
-            except Exception as e:
-                print(f"Error pulling DICOMS from remote archive for {iSubj}: {e}")
-                continue
+        _runForEachSubject(functools.partial(_pullDicomsFromRemote, archiveDir=args.pullDicomsFromRemote), subjList, nJobs)
         
     elif args.delData:
         subjList.reduceToExist()
-        for iSubj in subjList:
-            try:
-                iSubj.delteAllButMeta()
-            except Exception as e:
-                print(f"Error deleting all but meta for {iSubj}: {e}")
-                continue
+        _runForEachSubject(_delData, subjList) # Sequential: delteAllButMeta walks shared dataRoot
         
 
 ### ====================================================================================================================
@@ -509,9 +897,12 @@ def getArgGroup():
     groupZfmrf = miresearch_main.ParentAP.add_argument_group('ZFMRF Actions')
     groupZfmrf.add_argument('-qName', dest='qName', help='Query data by name', type=str, default=None)
     groupZfmrf.add_argument('-pTags', dest='pTags', help='Print Tags (except series)', action='store_true')
-    groupZfmrf.add_argument('-cpGating', dest='cpGating', help='Copy gating data to study', action='store_true')
+    groupZfmrf.add_argument('-cpGating', dest='cpGating', help='Copy gating data to study (skip if already present)', action='store_true')
+    groupZfmrf.add_argument('-cpGatingForce', dest='cpGatingForce', help='Copy gating data to study (even if already present)', action='store_true')
     groupZfmrf.add_argument('-cpSpectra', dest='cpSpectra', help='Copy spectra data to study', action='store_true')
     groupZfmrf.add_argument('-DEL', dest='delData', help='Delete all but META', action='store_true')
+    groupZfmrf.add_argument('-jobs', dest='jobs', help='Number of subjects to run concurrently (threads) for ZFMRF actions (not -DEL, not with database enabled)', 
+                            type=int, default=1)
     groupZfmrf.add_argument('-pullDICOMS', dest='pullDicomsFromRemote', 
                             help='Pull DICOMS from remote archive - give archive directory', type=str, default=None)
     return groupZfmrf